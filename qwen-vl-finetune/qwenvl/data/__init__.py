@@ -1,4 +1,8 @@
 import re
+from types import MappingProxyType
+
+# Optional "%NN" suffix selecting a sampling rate, e.g. "cambrian_737k%50"
+_SAMP_RE = re.compile(r"%(\d+)$")
 
 # Define placeholders for dataset paths
 CAMBRIAN_737K = {
@@ -70,7 +74,8 @@ oxe_absolute =  {
     "data_path": "/lustre1/tier2/projects/falcon-vla/oxe_raw_images/"
 }
 
-data_dict = {
+# Read-only registry; data_list hands out per-call copies of the entries
+data_dict = MappingProxyType({
     "cambrian_737k": CAMBRIAN_737K,
     "cambrian_737k_pack": CAMBRIAN_737K_PACK,
     "mp_doc": MP_DOC,
@@ -90,11 +95,11 @@ data_dict = {
     "oxe_relative": oxe_relative,
     "oxe_absolute": oxe_absolute,
 
-}
+})
 
 
 def parse_sampling_rate(dataset_name):
-    match = re.search(r"%(\d+)$", dataset_name)
+    match = _SAMP_RE.search(dataset_name)
     if match:
         return int(match.group(1)) / 100.0
     return 1.0
@@ -103,14 +108,16 @@ def parse_sampling_rate(dataset_name):
 def data_list(dataset_names):
     config_list = []
     for dataset_name in dataset_names:
-        sampling_rate = parse_sampling_rate(dataset_name)
-        dataset_name = re.sub(r"%(\d+)$", "", dataset_name)
-        if dataset_name in data_dict.keys():
-            config = data_dict[dataset_name].copy()
-            config["sampling_rate"] = sampling_rate
-            config_list.append(config)
+        match = _SAMP_RE.search(dataset_name)
+        if match:
+            sampling_rate = int(match.group(1)) / 100.0
+            dataset_name = dataset_name[:match.start()]
         else:
+            sampling_rate = 1.0
+        dataset_config = data_dict.get(dataset_name)
+        if dataset_config is None:
             raise ValueError(f"do not find {dataset_name}")
+        config_list.append({**dataset_config, "sampling_rate": sampling_rate})
     return config_list
 
 
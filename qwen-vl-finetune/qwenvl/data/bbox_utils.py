@@ -3,12 +3,66 @@ Utility functions for adjusting bounding box coordinates during online training.
 Handles coordinate transformation when images are dynamically resized.
 """
 
-import re
-import json
+import logging
+import math
+from functools import lru_cache
 from typing import Dict, Tuple, Any
-from PIL import Image
 
+from .point_utils import (
+    _MAYBE_ABSOLUTE_RE,
+    _POINT_PATTERN,
+    _adjust_point_absolute,
+    _adjust_point_relative,
+    _coord_re,
+    _scale_coord,
+    get_image_dimensions,
+)
 
+__all__ = [
+    "round_by_factor",
+    "ceil_by_factor",
+    "floor_by_factor",
+    "smart_resize_for_bbox",
+    "adjust_bbox_coordinates",
+    "parse_and_adjust_bbox_in_text",
+    "parse_and_adjust_coords_in_text",
+    "get_image_dimensions",
+    "should_adjust_coordinates",
+]
+
+logger = logging.getLogger(__name__)
+
+# Pattern to match bbox_2d in JSON format
+# Matches: "bbox_2d": [x1, y1, x2, y2], capturing the four integers directly
+_BBOX_PATTERN = (
+    r'"bbox_2d"\s*:\s*\[\s*(-?\d+)\s*,\s*(-?\d+)\s*,\s*(-?\d+)\s*,\s*(-?\d+)\s*\]'
+)
+_BBOX_RE = _coord_re.compile(_BBOX_PATTERN)
+
+# Single pattern for both keys, so texts with bboxes and points are scanned
+# once. Groups 1-4 hold bbox coordinates, groups 5-6 point coordinates.
+_COORD_RE = _coord_re.compile(f"{_BBOX_PATTERN}|{_POINT_PATTERN}")
+
+
+MAX_RATIO = 200
+
+
+def round_by_factor(number: int, factor: int) -> int:
+    """Returns the closest integer to 'number' that is divisible by 'factor'."""
+    return round(number / factor) * factor
+
+
+def ceil_by_factor(number: int, factor: int) -> int:
+    """Returns the smallest integer greater than or equal to 'number' that is divisible by 'factor'."""
+    return math.ceil(number / factor) * factor
+
+
+def floor_by_factor(number: int, factor: int) -> int:
+    """Returns the largest integer less than or equal to 'number' that is divisible by 'factor'."""
+    return math.floor(number / factor) * factor
+
+
+@lru_cache(maxsize=8192)
 def smart_resize_for_bbox(
     height: int, width: int, factor: int, min_pixels: int, max_pixels: int
 ) -> Tuple[int, int]:
@@ -24,20 +78,10 @@ def smart_resize_for_bbox(
         
     Returns:
         Tuple of (resized_height, resized_width)
+
+    Note:
+        Results are memoized, since the same resolutions recur across samples.
     """
-    import math
-    
-    MAX_RATIO = 200
-    
-    def round_by_factor(number: int, factor: int) -> int:
-        return round(number / factor) * factor
-    
-    def ceil_by_factor(number: int, factor: int) -> int:
-        return math.ceil(number / factor) * factor
-    
-    def floor_by_factor(number: int, factor: int) -> int:
-        return math.floor(number / factor) * factor
-    
     if max(height, width) / min(height, width) > MAX_RATIO:
         raise ValueError(
             f"absolute aspect ratio must be smaller than {MAX_RATIO}, "
@@ -81,15 +125,31 @@ def adjust_bbox_coordinates(
     Returns:
         Adjusted bbox coordinates
     """
+    return list(_adjust_bbox_coords_tuple(
+        bbox, orig_height, orig_width, resized_height, resized_width, is_relative
+    ))
+
+
+def _adjust_bbox_coords_tuple(
+    bbox: list,
+    orig_height: int,
+    orig_width: int,
+    resized_height: int,
+    resized_width: int,
+    is_relative: bool = True
+) -> Tuple[int, int, int, int]:
+    """Tuple-returning core of adjust_bbox_coordinates for internal callers."""
     x1, y1, x2, y2 = bbox
     
     if is_relative:
         # Qwen2-VL and Qwen3-VL use relative coordinates (0-1000 range)
         # These should already be in relative format, but we verify/convert
-        if max(bbox) > 1000:
+        if x1 > 1000 or y1 > 1000 or x2 > 1000 or y2 > 1000:
             # If coordinates are absolute, convert to relative
-            print(f"[WARNING] BBox {bbox} appears to be absolute (>1000), "
-                  f"converting to relative based on original dimensions")
+            logger.warning(
+                "BBox %s appears to be absolute (>1000), "
+                "converting to relative based on original dimensions", bbox
+            )
             new_x1 = int((x1 / orig_width) * 1000)
             new_y1 = int((y1 / orig_height) * 1000)
             new_x2 = int((x2 / orig_width) * 1000)
@@ -99,16 +159,14 @@ def adjust_bbox_coordinates(
             new_x1, new_y1, new_x2, new_y2 = x1, y1, x2, y2
     else:
         # Qwen2.5-VL uses absolute coordinates for resized image
-        # Scale from original absolute to resized absolute
-        scale_x = resized_width / orig_width
-        scale_y = resized_height / orig_height
-        
-        new_x1 = int(x1 * scale_x)
-        new_y1 = int(y1 * scale_y)
-        new_x2 = int(x2 * scale_x)
-        new_y2 = int(y2 * scale_y)
+        # Scale from original absolute to resized absolute, in exact integer
+        # arithmetic so results do not depend on float rounding
+        new_x1 = _scale_coord(x1, resized_width, orig_width)
+        new_y1 = _scale_coord(y1, resized_height, orig_height)
+        new_x2 = _scale_coord(x2, resized_width, orig_width)
+        new_y2 = _scale_coord(y2, resized_height, orig_height)
     
-    return [new_x1, new_y1, new_x2, new_y2]
+    return (new_x1, new_y1, new_x2, new_y2)
 
 
 def parse_and_adjust_bbox_in_text(
@@ -134,21 +192,137 @@ def parse_and_adjust_bbox_in_text(
         
     Returns:
         Text with adjusted bbox coordinates
+
+    Note:
+        Texts with bboxes to adjust are memoized, since packed datasets and
+        repeated epochs see the same conversation text many times. Debug
+        output is only printed on a cache miss.
+    """
+    # Most conversations carry no bbox at all; skip the regex pass for them
+    if "bbox_2d" not in text:
+        return text
+    # Relative bboxes only change when they need converting from absolute;
+    # purely a shortcut, such texts would come out unchanged anyway
+    if is_relative and not _MAYBE_ABSOLUTE_RE.search(text):
+        return text
+    return _adjust_bboxes_in_text(
+        text, orig_height, orig_width, resized_height, resized_width, is_relative, debug
+    )
+
+
+# Cached after the cheap checks above, so texts without coordinates never
+# take (and pin) a cache slot
+@lru_cache(maxsize=65536)
+def _adjust_bboxes_in_text(
+    text: str,
+    orig_height: int,
+    orig_width: int,
+    resized_height: int,
+    resized_width: int,
+    is_relative: bool,
+    debug: bool
+) -> str:
+    """Regex pass of parse_and_adjust_bbox_in_text."""
+    # Walk all bbox_2d occurrences once and splice the adjusted ones back.
+    # The pattern only matches well-formed 4-integer bboxes, anything else
+    # is left untouched.
+    pieces = []
+    last_end = 0
+    for match in _BBOX_RE.finditer(text):
+        coords = tuple(map(int, match.group(1, 2, 3, 4)))
+        if is_relative and max(coords) <= 1000:
+            continue  # Relative bbox that needs no conversion, keep it verbatim
+        adjusted_coords = _adjust_bbox_coords_tuple(
+            coords,
+            orig_height,
+            orig_width,
+            resized_height,
+            resized_width,
+            is_relative
+        )
+        if debug:
+            print(f"[BBOX ADJUSTMENT] Original: {coords}, "
+                  f"Adjusted: {adjusted_coords}")
+        pieces.append(text[last_end:match.start()])
+        pieces.append(f'"bbox_2d": [{", ".join(map(str, adjusted_coords))}]')
+        last_end = match.end()
+
+    if not pieces:
+        return text
+    pieces.append(text[last_end:])
+    return "".join(pieces)
+
+
+def parse_and_adjust_coords_in_text(
+    text: str,
+    orig_height: int,
+    orig_width: int,
+    resized_height: int,
+    resized_width: int,
+    is_relative: bool = True,
+    debug: bool = False
+) -> str:
     """
-    # Pattern to match bbox_2d in JSON format
-    # Matches: "bbox_2d": [x1, y1, x2, y2]
-    bbox_pattern = r'"bbox_2d"\s*:\s*\[([^\]]+)\]'
+    Parse text containing bbox_2d and/or point_2d coordinates and adjust them.
     
-    def replace_bbox(match):
-        coords_str = match.group(1)
-        try:
-            # Parse coordinates
-            coords = [int(x.strip()) for x in coords_str.split(',')]
-            if len(coords) != 4:
-                return match.group(0)  # Return unchanged if not 4 coordinates
-            
-            # Adjust coordinates
-            adjusted_coords = adjust_bbox_coordinates(
+    Same result as parse_and_adjust_bbox_in_text followed by
+    parse_and_adjust_point_in_text, but the text is scanned only once.
+    
+    Args:
+        text: Text containing JSON with bbox_2d and/or point_2d fields
+        orig_height: Original image height
+        orig_width: Original image width
+        resized_height: Resized image height  
+        resized_width: Resized image width
+        is_relative: True for Qwen2/Qwen3 (0-1000), False for Qwen2.5 (pixels)
+        debug: If True, print adjustment details
+        
+    Returns:
+        Text with adjusted bbox and point coordinates
+
+    Note:
+        Texts with coordinates to adjust are memoized, as in
+        parse_and_adjust_bbox_in_text.
+    """
+    if "bbox_2d" not in text and "point_2d" not in text:
+        return text
+    # Relative coordinates only change when they need converting from absolute;
+    # purely a shortcut, such texts would come out unchanged anyway
+    if is_relative and not _MAYBE_ABSOLUTE_RE.search(text):
+        return text
+    return _adjust_coords_in_text(
+        text, orig_height, orig_width, resized_height, resized_width, is_relative, debug
+    )
+
+
+@lru_cache(maxsize=65536)
+def _adjust_coords_in_text(
+    text: str,
+    orig_height: int,
+    orig_width: int,
+    resized_height: int,
+    resized_width: int,
+    is_relative: bool,
+    debug: bool
+) -> str:
+    """Regex pass of parse_and_adjust_coords_in_text, memoized like _adjust_bboxes_in_text."""
+    # is_relative is fixed for the whole text, so pick the point adjuster once
+    if is_relative:
+        adjust_point, point_args = _adjust_point_relative, (orig_height, orig_width)
+    else:
+        adjust_point = _adjust_point_absolute
+        point_args = (orig_height, orig_width, resized_height, resized_width)
+
+    # Walk all bbox_2d and point_2d occurrences once and splice the adjusted
+    # ones back
+    pieces = []
+    last_end = 0
+    for match in _COORD_RE.finditer(text):
+        if match.group(1) is not None:
+            coords = tuple(map(int, match.group(1, 2, 3, 4)))
+            if is_relative and max(coords) <= 1000:
+                continue  # Relative bbox that needs no conversion, keep it verbatim
+            adjusted_coords = _adjust_bbox_coords_tuple(
                 coords,
                 orig_height,
                 orig_width,
@@ -156,36 +330,32 @@ def parse_and_adjust_bbox_in_text(
                 resized_width,
                 is_relative
             )
-            
             if debug:
                 print(f"[BBOX ADJUSTMENT] Original: {coords}, "
                       f"Adjusted: {adjusted_coords}")
-            
-            # Return adjusted string
-            return f'"bbox_2d": [{", ".join(map(str, adjusted_coords))}]'
-        except (ValueError, IndexError) as e:
-            # If parsing fails, return original
+            replacement = f'"bbox_2d": [{", ".join(map(str, adjusted_coords))}]'
+        else:
+            try:
+                coords = (int(float(match.group(5))), int(float(match.group(6))))
+                if is_relative and max(coords) <= 1000:
+                    continue  # Relative point that needs no conversion, keep it verbatim
+                adjusted_coords = adjust_point(coords, *point_args)
+            except Exception as e:
+                if debug:
+                    print(f"[POINT ADJUSTMENT ERROR] {e}")
+                continue  # Keep original on error
             if debug:
-                print(f"[BBOX ADJUSTMENT ERROR] {e}")
-            return match.group(0)
-    
-    # Replace all bbox_2d occurrences
-    adjusted_text = re.sub(bbox_pattern, replace_bbox, text)
-    return adjusted_text
-
+                print(f"[POINT ADJUSTMENT] Original: {coords}, "
+                      f"Adjusted: {adjusted_coords}")
+            replacement = f'"point_2d": [{adjusted_coords[0]}, {adjusted_coords[1]}]'
+        pieces.append(text[last_end:match.start()])
+        pieces.append(replacement)
+        last_end = match.end()
 
-def get_image_dimensions(image_path: str) -> Tuple[int, int]:
-    """
-    Get image dimensions without fully loading it into memory.
-    
-    Args:
-        image_path: Path to image file
-        
-    Returns:
-        Tuple of (width, height)
-    """
-    with Image.open(image_path) as img:
-        return img.size  # Returns (width, height)
+    if not pieces:
+        return text
+    pieces.append(text[last_end:])
+    return "".join(pieces)
 
 
 def should_adjust_coordinates(conversation: Dict[str, Any]) -> bool:
@@ -19,13 +19,8 @@ from . import data_list
 from .rope2d import get_rope_index_25, get_rope_index_2, get_rope_index_3
 from .bbox_utils import (
     smart_resize_for_bbox,
-    parse_and_adjust_bbox_in_text,
+    parse_and_adjust_coords_in_text,
     get_image_dimensions,
-    should_adjust_coordinates as should_adjust_bbox,
-)
-from .point_utils import (
-    parse_and_adjust_point_in_text,
-    should_adjust_point_coordinates,
 )
 
 IGNORE_INDEX = -100
@@ -184,6 +179,9 @@ def _build_messages(
     image_paths = [_make_abs_paths(base_path, img) for img in images]
     video_paths = [_make_abs_paths(base_path, vid) for vid in videos]
     
+    # Determine if coordinates need adjustment based on model type
+    is_relative = (model_type in ["qwen2vl", "qwen3vl"])
+
     # Calculate resize info if processor provided
     image_resize_info = []
     if processor is not None and data_args is not None:
@@ -204,7 +202,7 @@ def _build_messages(
                     "orig_width": width,
                     "orig_height": height,
                     "resized_width": resized_width,
-                    "resized_height": resized_height
+                    "resized_height": resized_height,
                 })
             except Exception as e:
                 rank0_print(f"Warning: Could not get dimensions for {img_path}: {e}")
@@ -256,34 +254,16 @@ def _build_messages(
                 resize_info = image_resize_info[current_image_idx - 1]
                 
                 if resize_info is not None:
-                    # Determine if coordinates need adjustment based on model type
-                    is_relative = (model_type in ["qwen2vl", "qwen3vl"])
-                    
-                    # Adjust bbox_2d if present
-                    if should_adjust_bbox(turn):
-                        adjusted_text = parse_and_adjust_bbox_in_text(
-                            text,
-                            resize_info["orig_height"],
-                            resize_info["orig_width"],
-                            resize_info["resized_height"],
-                            resize_info["resized_width"],
-                            is_relative=is_relative,
-                            debug=False
-                        )
-                        text = adjusted_text
-                    
-                    # Adjust point_2d if present
-                    if should_adjust_point_coordinates(turn):
-                        adjusted_text = parse_and_adjust_point_in_text(
-                            text,
-                            resize_info["orig_height"],
-                            resize_info["orig_width"],
-                            resize_info["resized_height"],
-                            resize_info["resized_width"],
-                            is_relative=is_relative,
-                            debug=False
-                        )
-                        text = adjusted_text
+                    # Adjust bbox_2d and point_2d (if present) in a single pass
+                    text = parse_and_adjust_coords_in_text(
+                        text,
+                        resize_info["orig_height"],
+                        resize_info["orig_width"],
+                        resize_info["resized_height"],
+                        resize_info["resized_width"],
+                        is_relative=is_relative,
+                        debug=False
+                    )
             
             messages.append({"role": role, "content": [{"type": "text", "text": text}]})
 
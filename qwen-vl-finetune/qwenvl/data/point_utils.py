@@ -14,10 +14,48 @@ Date: 2025
 """
 
 import re
-import json
+import logging
+from functools import lru_cache
 from typing import Tuple, List, Dict, Any
+
+import numpy as np
 from PIL import Image
 
+__all__ = [
+    "pixel_to_qwen3vl_point",
+    "qwen3vl_to_pixel_point",
+    "adjust_point_coordinates",
+    "parse_and_adjust_point_in_text",
+    "get_image_dimensions",
+    "should_adjust_point_coordinates",
+    "batch_convert_pixels_to_qwen3vl",
+    "batch_convert_pixels_to_qwen3vl_soa",
+    "validate_point_format",
+]
+
+logger = logging.getLogger(__name__)
+
+# Use Google RE2 (linear-time DFA matching) for the coordinate pattern when it
+# is installed, otherwise fall back to the standard library engine
+try:
+    import re2 as _coord_re
+except ImportError:
+    _coord_re = re
+
+# Pattern to match point_2d in JSON format
+# Matches: "point_2d": [x, y], capturing both numbers directly (any JSON
+# number form, including exponents such as 1e3)
+_NUMBER_PATTERN = r'-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?'
+_POINT_PATTERN = (
+    rf'"point_2d"\s*:\s*\[\s*({_NUMBER_PATTERN})\s*,\s*({_NUMBER_PATTERN})\s*\]'
+)
+_POINT_RE = _coord_re.compile(_POINT_PATTERN)
+
+# A coordinate only looks absolute (>1000) if it has at least four digits
+# or an exponent; relative-mode texts without such a number are returned
+# untouched
+_MAYBE_ABSOLUTE_RE = re.compile(r'\d{4}|\d[eE]')
+
 
 def pixel_to_qwen3vl_point(
     pixel_x: int,
@@ -99,30 +137,58 @@ def adjust_point_coordinates(
         For Qwen3-VL (relative coordinates), this returns the original point unchanged.
         For Qwen2.5-VL (absolute coordinates), adjusts based on resize ratios.
     """
-    x, y = point
-    
     if is_relative:
         # Qwen3-VL: relative coordinates are scale-invariant
-        # Check if coords appear to be relative (0-1000 range)
-        if max(point) <= 1000:
-            return [x, y]
-        else:
-            # Appears to be absolute, convert to relative
-            print(f"[WARNING] Point {point} appears to be absolute (>1000), "
-                  f"converting to relative based on original dimensions")
-            return [
-                int((x / original_width) * 1000),
-                int((y / original_height) * 1000)
-            ]
+        return list(_adjust_point_relative(point, original_height, original_width))
     else:
         # Qwen2.5-VL: absolute pixel coordinates need adjustment
-        ratio_w = resized_width / original_width
-        ratio_h = resized_height / original_height
-        
-        adjusted_x = int(x * ratio_w)
-        adjusted_y = int(y * ratio_h)
-        
-        return [adjusted_x, adjusted_y]
+        return list(_adjust_point_absolute(
+            point, original_height, original_width, resized_height, resized_width
+        ))
+
+
+def _adjust_point_relative(
+    point: list,
+    original_height: int,
+    original_width: int
+) -> Tuple[int, int]:
+    """Relative (0-1000) specialization of adjust_point_coordinates."""
+    x, y = point
+    # Check if coords appear to be relative (0-1000 range)
+    if x <= 1000 and y <= 1000:
+        return (x, y)
+    # Appears to be absolute, convert to relative
+    logger.warning(
+        "Point %s appears to be absolute (>1000), "
+        "converting to relative based on original dimensions", point
+    )
+    return (
+        int((x / original_width) * 1000),
+        int((y / original_height) * 1000)
+    )
+
+
+def _scale_coord(value: int, new_size: int, old_size: int) -> int:
+    """Exact integer value * new_size / old_size, truncated toward zero like int()."""
+    if value >= 0:
+        return value * new_size // old_size
+    return -(-value * new_size // old_size)
+
+
+def _adjust_point_absolute(
+    point: list,
+    original_height: int,
+    original_width: int,
+    resized_height: int,
+    resized_width: int
+) -> Tuple[int, int]:
+    """Absolute (pixel) specialization of adjust_point_coordinates."""
+    x, y = point
+    # Exact integer arithmetic, so results do not depend on float rounding
+    return (
+        _scale_coord(x, resized_width, original_width),
+        _scale_coord(y, resized_height, original_height)
+    )
 
 
 def parse_and_adjust_point_in_text(
@@ -153,46 +219,80 @@ def parse_and_adjust_point_in_text(
         >>> text = '{"point_2d": [100, 150], "label": "person"}'
         >>> parse_and_adjust_point_in_text(text, 600, 800, 450, 600, is_relative=False)
         '{"point_2d": [75, 112], "label": "person"}'
+        
+    Note:
+        Texts with points to adjust are memoized, since packed datasets and
+        repeated epochs see the same conversation text many times. Debug
+        output is only printed on a cache miss.
     """
-    # Pattern to match point_2d in JSON format
-    # Matches: "point_2d": [x, y]
-    point_pattern = r'"point_2d"\s*:\s*\[([^\]]+)\]'
-    
-    def replace_point(match):
-        coords_str = match.group(1)
+    # Most conversations carry no point at all; skip the regex pass for them
+    if "point_2d" not in text:
+        return text
+    # Relative points only change when they need converting from absolute;
+    # purely a shortcut, such texts would come out unchanged anyway
+    if is_relative and not _MAYBE_ABSOLUTE_RE.search(text):
+        return text
+    return _adjust_points_in_text(
+        text, original_height, original_width, resized_height, resized_width, is_relative, debug
+    )
+
+
+# Cached after the cheap checks above, so texts without points never take
+# (and pin) a cache slot
+@lru_cache(maxsize=65536)
+def _adjust_points_in_text(
+    text: str,
+    original_height: int,
+    original_width: int,
+    resized_height: int,
+    resized_width: int,
+    is_relative: bool,
+    debug: bool
+) -> str:
+    """Regex pass of parse_and_adjust_point_in_text."""
+    first_match = _POINT_RE.search(text)
+    if first_match is None:
+        return text
+
+    # is_relative is fixed for the whole text, so pick the specialized
+    # adjuster and its arguments once
+    if is_relative:
+        adjust, adjust_args = _adjust_point_relative, (original_height, original_width)
+    else:
+        adjust = _adjust_point_absolute
+        adjust_args = (original_height, original_width, resized_height, resized_width)
+
+    # Walk all point_2d occurrences once and splice the adjusted ones back
+    pieces = []
+    last_end = 0
+    for match in _POINT_RE.finditer(text, first_match.start()):
         try:
             # Parse coordinates
-            coords = [int(float(c.strip())) for c in coords_str.split(',')]
-            if len(coords) != 2:
-                return match.group(0)  # Return original if not 2 coords
+            coords = (int(float(match.group(1))), int(float(match.group(2))))
+            if is_relative and max(coords) <= 1000:
+                continue  # Relative point that needs no conversion, keep it verbatim
             
             # Adjust coordinates
-            adjusted_coords = adjust_point_coordinates(
-                coords,
-                original_height,
-                original_width,
-                resized_height,
-                resized_width,
-                is_relative
-            )
-            
-            if debug:
-                print(f"[POINT ADJUSTMENT] Original: {coords}, "
-                      f"Adjusted: {adjusted_coords}")
-            
-            # Return adjusted point in same format
-            return f'"point_2d": [{adjusted_coords[0]}, {adjusted_coords[1]}]'
+            adjusted_coords = adjust(coords, *adjust_args)
         except Exception as e:
             if debug:
                 print(f"[POINT ADJUSTMENT ERROR] {e}")
-            return match.group(0)  # Return original on error
-    
-    # Replace all point_2d occurrences
-    adjusted_text = re.sub(point_pattern, replace_point, text)
+            continue  # Keep original on error
+        
+        if debug:
+            print(f"[POINT ADJUSTMENT] Original: {coords}, "
+                  f"Adjusted: {adjusted_coords}")
+        
+        # Emit adjusted point in same format
+        pieces.append(text[last_end:match.start()])
+        pieces.append(f'"point_2d": [{adjusted_coords[0]}, {adjusted_coords[1]}]')
+        last_end = match.end()
     
-    return adjusted_text
+    pieces.append(text[last_end:])
+    return "".join(pieces)
 
 
+@lru_cache(maxsize=100_000)
 def get_image_dimensions(image_path: str) -> Tuple[int, int]:
     """
     Get image dimensions without fully loading the image.
@@ -204,7 +304,8 @@ def get_image_dimensions(image_path: str) -> Tuple[int, int]:
         Tuple of (width, height)
         
     Note:
-        This is a fast operation that only reads the image header.
+        This is a fast operation that only reads the image header, and the
+        result is cached per path.
     """
     with Image.open(image_path) as img:
         return img.size  # Returns (width, height)
@@ -256,26 +357,52 @@ def batch_convert_pixels_to_qwen3vl(
             {'point_2d': [250, 417], 'label': 'person', 'role': 'referee'}
         ]
     """
-    converted_points = []
+    # Convert coordinates column-wise, then reattach the other attributes
+    qwen_coords = batch_convert_pixels_to_qwen3vl_soa(
+        np.array([point['x'] for point in points], dtype=np.float64),
+        np.array([point['y'] for point in points], dtype=np.float64),
+        image_width, image_height
+    ).tolist()
     
-    for point in points:
-        # Convert coordinates
-        qwen_coords = pixel_to_qwen3vl_point(
-            point['x'], point['y'],
-            image_width, image_height
-        )
-        
-        # Create new dict with converted coords
-        converted_point = {'point_2d': qwen_coords}
+    return [
+        {'point_2d': coords, **{k: v for k, v in point.items() if k not in ('x', 'y')}}
+        for point, coords in zip(points, qwen_coords)
+    ]
+
+
+def batch_convert_pixels_to_qwen3vl_soa(
+    xs: np.ndarray,
+    ys: np.ndarray,
+    image_width: int,
+    image_height: int
+) -> np.ndarray:
+    """
+    Convert columnar pixel coordinates to Qwen3-VL format (0-1000 range).
+    
+    Args:
+        xs: Array of N x coordinates in pixels
+        ys: Array of N y coordinates in pixels
+        image_width: Image width in pixels
+        image_height: Image height in pixels
         
-        # Copy all other attributes
-        for key, value in point.items():
-            if key not in ['x', 'y']:
-                converted_point[key] = value
+    Returns:
+        Int32 array of shape (N, 2) with [x, y] rows, truncated the same way
+        as pixel_to_qwen3vl_point
         
-        converted_points.append(converted_point)
-    
-    return converted_points
+    Example:
+        >>> batch_convert_pixels_to_qwen3vl_soa(np.array([100, 200]), np.array([150, 250]), 800, 600)
+        array([[125, 250],
+               [250, 416]], dtype=int32)
+    """
+    xs = np.asarray(xs, dtype=np.float64)
+    ys = np.asarray(ys, dtype=np.float64)
+    return np.stack(
+        [
+            (xs / image_width * 1000).astype(np.int32),
+            (ys / image_height * 1000).astype(np.int32),
+        ],
+        axis=1
+    )
 
 
 def validate_point_format(point_dict: dict, is_relative: bool = True) -> Tuple[bool, str]:
@@ -3,45 +3,83 @@
 Helper script to pre-download Qwen model to avoid cache corruption
 during distributed training.
 """
+import os
 import sys
 import argparse
+import importlib.util
+from pathlib import Path
+
+# Files needed to load tokenizer and processor (incl. remote code); the
+# weight files are added by weight_patterns()
+ALLOW_PATTERNS = [
+    "*.json",
+    "*.txt",
+    "tokenizer*",
+    "*.model",
+    "*.py",
+    "*.jinja",
+]
+
+WEIGHT_SUFFIXES = (".safetensors", ".bin")
+
+
+def weight_patterns(repo_files):
+    """Prefer safetensors weights, fall back to PyTorch .bin checkpoints."""
+    if any(f.endswith(".safetensors") for f in repo_files):
+        return ["*.safetensors"]
+    return ["*.bin"]
+
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--model_name", type=str, required=True)
+    parser.add_argument("--max_workers", type=int, default=16,
+                        help="Number of files downloaded in parallel")
     args = parser.parse_args()
-    
+
     print(f"Pre-downloading model: {args.model_name}")
-    
+
+    # Rust-based multi-connection transfer, must be set before importing the hub
+    if importlib.util.find_spec("hf_transfer") is not None:
+        os.environ.setdefault("HF_HUB_ENABLE_HF_TRANSFER", "1")
+
     try:
-        from transformers import AutoModel, AutoTokenizer, AutoProcessor
-        
-        # Download model
-        print("Downloading model...")
-        model = AutoModel.from_pretrained(
+        from huggingface_hub import list_repo_files, snapshot_download
+        from transformers import AutoTokenizer, AutoProcessor
+
+        # Download all model artifacts in parallel
+        print("Downloading model snapshot...")
+        local_path = snapshot_download(
             args.model_name,
-            trust_remote_code=True
+            max_workers=args.max_workers,
+            allow_patterns=ALLOW_PATTERNS + weight_patterns(list_repo_files(args.model_name)),
         )
-        print(f"✓ Model downloaded successfully")
-        
-        # Download tokenizer
-        print("Downloading tokenizer...")
+        print(f"✓ Snapshot downloaded to {local_path}")
+
+        # The tokenizer/processor checks below do not touch the weights
+        weights = [p for p in Path(local_path).rglob("*") if p.name.endswith(WEIGHT_SUFFIXES)]
+        if not weights:
+            print(f"❌ Error: no model weights (*.safetensors / *.bin) found in {local_path}")
+            sys.exit(1)
+        print(f"✓ Found {len(weights)} weight file(s)")
+
+        # Verify tokenizer and processor load from the local snapshot
+        print("Verifying tokenizer...")
         tokenizer = AutoTokenizer.from_pretrained(
-            args.model_name,
+            local_path,
             trust_remote_code=True
         )
-        print(f"✓ Tokenizer downloaded successfully")
-        
-        # Download processor
-        print("Downloading processor...")
+        print(f"✓ Tokenizer loaded successfully")
+
+        print("Verifying processor...")
         processor = AutoProcessor.from_pretrained(
-            args.model_name,
+            local_path,
             trust_remote_code=True
         )
-        print(f"✓ Processor downloaded successfully")
-        
+        print(f"✓ Processor loaded successfully")
+
         print(f"\n✅ All model artifacts downloaded for {args.model_name}")
-        
+
     except Exception as e:
         print(f"⚠️  Warning: Could not pre-download model: {e}")
         sys.exit(1)
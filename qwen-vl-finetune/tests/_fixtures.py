@@ -0,0 +1,20 @@
+"""
+Test data shared by the pytest suite and test_coordinate_adjustment.py.
+"""
+
+import zlib
+import base64
+
+# Solid red 800x600 JPEG, zlib-compressed and base64-encoded, so the test
+# image is written to disk without a JPEG encode on every run
+_RED_800X600_JPG = (
+    b"eNrtzktKxEAQBuCqNHanTYdJa0Zi6JiHQhRC0J7AzIAyA0JAT+CdvJQLD+FrMTdpE8GF"
+    b"mZX7+mr381NV7s3tIHrsH3pABMBhwH3CPficC37gCyGk9A9VHKogUKdHx7M4S/OzLDWm"
+    b"uGjromrOjblcXjXXN13X5fX6bmVv20VnxyUopVSBSsIwsaUp7b+5F9C+98QKhhV4GplG"
+    b"9wrzn1f/4EMcR9MUhvQEcdrmYmzr/fYHKIbDHaZhA89ov7ZACCGEEEII+YXu/RvmaSuE"
+)
+
+
+def red_800x600_jpg():
+    """Bytes of the 800x600 red JPEG."""
+    return zlib.decompress(base64.b64decode(_RED_800X600_JPG))
@@ -0,0 +1,17 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Make `qwenvl` importable regardless of where pytest is launched from
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from tests._fixtures import red_800x600_jpg  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def test_image_path(tmp_path_factory):
+    """800x600 red JPEG, written once per test session."""
+    path = tmp_path_factory.mktemp("images") / "red_800x600.jpg"
+    path.write_bytes(red_800x600_jpg())
+    return str(path)
@@ -0,0 +1,214 @@
+"""
+Tests for coordinate adjustment in bbox_utils, point_utils and data_processor.
+
+Pytest version of test_coordinate_adjustment.py.
+"""
+
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+
+from qwenvl.data.bbox_utils import (
+    smart_resize_for_bbox,
+    adjust_bbox_coordinates,
+    parse_and_adjust_bbox_in_text,
+    parse_and_adjust_coords_in_text,
+    _adjust_coords_in_text,
+)
+from qwenvl.data.point_utils import (
+    adjust_point_coordinates,
+    parse_and_adjust_point_in_text,
+)
+
+# 800x600 image resized to 600x450
+ORIG_H, ORIG_W = 600, 800
+RESIZED_H, RESIZED_W = 450, 600
+
+
+@pytest.mark.parametrize(
+    "adjust, coords, is_relative, expected",
+    [
+        # Qwen2.5-VL: absolute pixel coordinates are rescaled
+        (adjust_bbox_coordinates, [100, 100, 300, 300], False, [75, 75, 225, 225]),
+        # Qwen3-VL: relative 0-1000 coordinates are unchanged
+        (adjust_bbox_coordinates, [125, 167, 375, 500], True, [125, 167, 375, 500]),
+        # Negative values are truncated toward zero, like int()
+        (adjust_bbox_coordinates, [-49, -1, 49, 1], False, [-36, 0, 36, 0]),
+        (adjust_point_coordinates, [400, 300], False, [300, 225]),
+        (adjust_point_coordinates, [500, 500], True, [500, 500]),
+    ],
+    ids=["bbox-absolute", "bbox-relative", "bbox-negative", "point-absolute", "point-relative"],
+)
+def test_adjust_coordinates(adjust, coords, is_relative, expected):
+    assert adjust(
+        coords, ORIG_H, ORIG_W, RESIZED_H, RESIZED_W, is_relative=is_relative
+    ) == expected
+
+
+@pytest.mark.parametrize(
+    "parse, text, expected",
+    [
+        (
+            parse_and_adjust_bbox_in_text,
+            '{"bbox_2d": [100, 100, 300, 300], "label": "car"}',
+            '{"bbox_2d": [75, 75, 225, 225], "label": "car"}',
+        ),
+        # Values beyond int32 are scaled exactly, not wrapped
+        (
+            parse_and_adjust_bbox_in_text,
+            '{"bbox_2d": [3000000000, 1, 2, 3]}',
+            '{"bbox_2d": [2250000000, 0, 1, 2]}',
+        ),
+        (
+            parse_and_adjust_point_in_text,
+            '{"point_2d": [400, 300], "label": "person"}',
+            '{"point_2d": [300, 225], "label": "person"}',
+        ),
+        (
+            parse_and_adjust_point_in_text,
+            '{"point_2d": [1e3, 5.0E0]}',
+            '{"point_2d": [750, 3]}',
+        ),
+    ],
+    ids=["bbox", "bbox-large", "point", "point-exponent"],
+)
+def test_parse_and_adjust_in_text(parse, text, expected):
+    assert parse(
+        text, ORIG_H, ORIG_W, RESIZED_H, RESIZED_W, is_relative=False, debug=False
+    ) == expected
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        # Nothing looks absolute, so the text is returned verbatim
+        ('{"bbox_2d":[125,167,375,500]} {"point_2d": [500.5, 300]}',
+         '{"bbox_2d":[125,167,375,500]} {"point_2d": [500.5, 300]}'),
+        # An unrelated 4-digit number does not change the result
+        ('{"point_2d": [500.7, 300]} year 2024', '{"point_2d": [500.7, 300]} year 2024'),
+        # Absolute values (>1000) are still converted to relative
+        ('{"bbox_2d": [1600, 300, 400, 500]}', '{"bbox_2d": [800, 300, 200, 500]}'),
+        # Only the coordinates that need converting are rewritten
+        ('{"bbox_2d": [1600, 300, 400, 500]} {"point_2d": [500.7, 300]}',
+         '{"bbox_2d": [800, 300, 200, 500]} {"point_2d": [500.7, 300]}'),
+    ],
+    ids=["verbatim", "stray-number", "absolute-converted", "mixed"],
+)
+def test_parse_and_adjust_relative(text, expected):
+    args = (1000, 2000, 1008, 1988)
+    assert parse_and_adjust_coords_in_text(text, *args, is_relative=True) == expected
+    # Same result as the separate bbox and point passes
+    assert parse_and_adjust_point_in_text(
+        parse_and_adjust_bbox_in_text(text, *args, is_relative=True),
+        *args,
+        is_relative=True
+    ) == expected
+
+
+def test_parse_and_adjust_same_size_normalizes_text():
+    # Absolute coordinates are rewritten even when the image is not resized,
+    # so the target format does not depend on the image size
+    text = '{"point_2d": [100.7, 200], "bbox_2d":[1,2,3,4]}'
+    assert parse_and_adjust_coords_in_text(
+        text, 588, 812, 588, 812, is_relative=False
+    ) == '{"point_2d": [100, 200], "bbox_2d": [1, 2, 3, 4]}'
+
+
+def test_only_texts_to_adjust_are_cached():
+    _adjust_coords_in_text.cache_clear()
+    args = (ORIG_H, ORIG_W, RESIZED_H, RESIZED_W)
+    # No coordinates, or relative coordinates that need no conversion
+    parse_and_adjust_coords_in_text("A plain caption.", *args, is_relative=False)
+    parse_and_adjust_coords_in_text('{"point_2d": [500, 500]}', *args, is_relative=True)
+    assert _adjust_coords_in_text.cache_info().currsize == 0
+
+    text = '{"point_2d": [400, 300]}'
+    for _ in range(2):
+        assert parse_and_adjust_coords_in_text(text, *args, is_relative=False) == '{"point_2d": [300, 225]}'
+    info = _adjust_coords_in_text.cache_info()
+    assert (info.currsize, info.hits) == (1, 1)
+
+
+def test_smart_resize_within_pixel_bounds():
+    min_pixels = 256 * 28 * 28
+    max_pixels = 1280 * 28 * 28
+    resized_h, resized_w = smart_resize_for_bbox(1200, 1600, 28, min_pixels, max_pixels)
+    assert min_pixels <= resized_h * resized_w <= max_pixels
+
+
+@pytest.fixture(scope="module")
+def build_messages():
+    # data_processor pulls in torch and transformers
+    pytest.importorskip("torch")
+    pytest.importorskip("transformers")
+    from qwenvl.data.data_processor import _build_messages
+    return _build_messages
+
+
+@pytest.mark.parametrize(
+    "model_type, point, is_relative",
+    [
+        ("qwen2.5vl", [400, 300], False),
+        ("qwen3vl", [500, 500], True),
+    ],
+)
+def test_build_messages_adjusts_points(build_messages, test_image_path, model_type, point, is_relative):
+    item = {
+        "image": test_image_path,
+        "conversations": [
+            {"from": "human", "value": "<image>\nLocate the person."},
+            {"from": "gpt", "value": f'{{"point_2d": {point}, "label": "person"}}'},
+        ],
+    }
+
+    processor = MagicMock()
+    processor.image_processor.merge_size = 2
+    processor.image_processor.patch_size = 14
+
+    data_args = MagicMock()
+    data_args.min_pixels = 256 * 28 * 28
+    data_args.max_pixels = 1280 * 28 * 28
+
+    # The processor resizes 800x600 by smart_resize, not to a fixed size
+    resized_h, resized_w = smart_resize_for_bbox(
+        ORIG_H, ORIG_W, 28, data_args.min_pixels, data_args.max_pixels
+    )
+    expected = adjust_point_coordinates(
+        point, ORIG_H, ORIG_W, resized_h, resized_w, is_relative=is_relative
+    )
+    if is_relative:
+        assert expected == point
+
+    messages = build_messages(
+        item, Path("."), processor=processor, data_args=data_args, model_type=model_type
+    )
+    assert f'"point_2d": {expected}' in messages[1]["content"][0]["text"]
+
+
+def test_build_messages_normalizes_unresized_image(build_messages, monkeypatch):
+    # 812x588 is already a multiple of 28, so smart_resize keeps its size
+    monkeypatch.setattr(
+        "qwenvl.data.data_processor.get_image_dimensions", lambda path: (812, 588)
+    )
+    item = {
+        "image": "unresized.jpg",
+        "conversations": [
+            {"from": "human", "value": "<image>\nLocate the person."},
+            {"from": "gpt", "value": '{"point_2d": [100.7, 200], "bbox_2d":[1,2,3,4]}'},
+        ],
+    }
+
+    processor = MagicMock()
+    processor.image_processor.merge_size = 2
+    processor.image_processor.patch_size = 14
+
+    data_args = MagicMock()
+    data_args.min_pixels = 256 * 28 * 28
+    data_args.max_pixels = 1280 * 28 * 28
+    assert smart_resize_for_bbox(588, 812, 28, data_args.min_pixels, data_args.max_pixels) == (588, 812)
+
+    messages = build_messages(
+        item, Path("."), processor=processor, data_args=data_args, model_type="qwen2.5vl"
+    )
+    assert messages[1]["content"][0]["text"] == '{"point_2d": [100, 200], "bbox_2d": [1, 2, 3, 4]}'
@@ -0,0 +1,175 @@
+"""
+Tests for tools/convert_pointing_to_qwen.py.
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "tools"))
+
+import convert_pointing_to_qwen as conv  # noqa: E402
+
+
+def _item(user, assistant, item_id=0):
+    return {
+        "id": item_id,
+        "image": f"{item_id}.jpg",
+        "conversations": [
+            {"from": "user", "value": user},
+            {"from": "assistant", "value": assistant},
+        ],
+    }
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("<point>[[100, 200], [300, 400]]</point>", [[100, 200], [300, 400]]),
+        # Floats are rounded (half to even, like round())
+        ("<point>[[1.6, 2.0], [2.5, -0.4]]</point>", [[2, 2], [2, 0]]),
+        # Exponents are one number each, so later pairs do not shift
+        ("<point>[[1e3, 2], [3, 4]]</point>", [[1000, 2], [3, 4]]),
+        ("<point>[[1.5E2, 2.0], [3, 4]]</point>", [[150, 2], [3, 4]]),
+        # Entries that are not an [x, y] pair are dropped without shifting
+        # the pairs that follow them
+        ("<point>[[1, 2], [3]]</point>", [[1, 2]]),
+        ("<point>[[100, 200, 5], [300, 400]]</point>", [[300, 400]]),
+        ("<point>[[1, 2, 3], [4, 5, 6]]</point>", []),
+        ('<point>[["a", 2], [3, 4]]</point>', [[3, 4]]),
+        ("<point>[]</point>", []),
+        ("no points here", []),
+        # Out of int32 range fails the whole block
+        ("<point>[[99999999999, 2]]</point>", []),
+    ],
+    ids=[
+        "int", "float", "exponent", "exponent-float", "short-entry", "long-entry",
+        "all-long", "non-numeric", "empty", "missing", "overflow",
+    ],
+)
+def test_extract_points_from_response(text, expected):
+    points = conv.extract_points_from_response(text)
+    assert points.dtype.name == "int32"
+    assert points.shape == (len(expected), 2)
+    assert points.tolist() == expected
+
+
+def test_invalid_points_are_reported(capsys):
+    conv.extract_points_from_response("<point>[[1, 2], [3, 4, 5], [6]]</point>")
+    assert "Skipping 2 invalid point(s)" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "<ref>cat</ref> <point>[[1, 2]]</point>",
+        "<point>[[1.5, 2e1]]</point><ref> dog </ref><ref>cat</ref>",
+        "<ref>cat</ref>",
+        "nothing",
+    ],
+)
+def test_extract_ref_and_points_matches_separate_passes(text):
+    label, points = conv.extract_ref_and_points(text)
+    assert label == conv.extract_label_from_ref(text)
+    assert points.tolist() == conv.extract_points_from_response(text).tolist()
+
+
+def test_convert_to_qwen_format():
+    item = _item(
+        "Point at the <ref>person</ref> in <image>.",
+        "<ref>person</ref> <point>[[100, 200], [300.4, 4e2]]</point>",
+    )
+    converted, reason = conv.convert_to_qwen_format(item)
+    assert reason is None
+    assert converted == {
+        "image": "0.jpg",
+        "conversations": [
+            {
+                "from": "human",
+                "value": "<image>\nLocate all person in this image and return points in JSON format.",
+            },
+            {
+                "from": "gpt",
+                "value": '[{"point_2d": [100, 200], "label": "person"}, '
+                         '{"point_2d": [300, 400], "label": "person"}]',
+            },
+        ],
+    }
+
+
+@pytest.mark.parametrize(
+    "item, reason",
+    [
+        ({"id": 1, "conversations": []}, conv.SKIP_INCOMPLETE),
+        (_item("<ref>cat</ref>", "The cat is not in the image."), conv.SKIP_ABSENT),
+        (_item("<ref>cat</ref>", "Object absent."), conv.SKIP_ABSENT),
+        (_item("<ref>cat</ref>", "A notable cat, no coordinates."), conv.SKIP_NO_POINTS),
+        (_item("<ref>cat</ref>", "<point>[]</point>"), conv.SKIP_NO_POINTS),
+        (_item("<ref>cat</ref>", "<point>[[99999999999, 2]]</point>"), conv.SKIP_BAD_POINTS),
+        (_item("<ref>cat</ref>", "<point>[[1, 2, 3], [4]]</point>"), conv.SKIP_BAD_POINTS),
+    ],
+    ids=["incomplete", "not", "absent", "no-points", "empty-block", "overflow", "malformed"],
+)
+def test_convert_to_qwen_format_skip_reasons(item, reason):
+    assert conv.convert_to_qwen_format(item) == (None, reason)
+
+
+@pytest.mark.parametrize("num_workers", ["1", "2"])
+def test_main_writes_converted_items(tmp_path, monkeypatch, num_workers):
+    items = [
+        _item("<ref>cat</ref>", "<point>[[1, 2]]</point>", 0),
+        _item("<ref>cat</ref>", "not here", 1),
+        _item("<ref>dog</ref>", "<point>[[3.5, 4]]</point>", 2),
+    ]
+    input_file = tmp_path / "in.jsonl"
+    input_file.write_text("\n".join(json.dumps(item) for item in items) + "\n")
+    output_file = tmp_path / "out.json"
+    malformed_file = tmp_path / "bad.json"
+
+    monkeypatch.setattr(sys, "argv", [
+        "convert_pointing_to_qwen.py", str(input_file), str(output_file),
+        "--num-workers", num_workers, "--save-malformed", str(malformed_file),
+    ])
+    conv.main()
+
+    expected = [conv.convert_to_qwen_format(items[0])[0], conv.convert_to_qwen_format(items[2])[0]]
+    assert output_file.read_text(encoding="utf-8") == json.dumps(expected, indent=2, ensure_ascii=False)
+    assert json.loads(malformed_file.read_text()) == [items[1]]
+    assert not (tmp_path / "out.json.tmp").exists()
+
+
+def test_main_jsonl_out(tmp_path, monkeypatch):
+    items = [_item("<ref>cat</ref>", "<point>[[1, 2]]</point>", i) for i in range(3)]
+    input_file = tmp_path / "in.json"
+    input_file.write_text(json.dumps(items))
+    output_file = tmp_path / "out.jsonl"
+
+    monkeypatch.setattr(sys, "argv", [
+        "convert_pointing_to_qwen.py", str(input_file), str(output_file),
+        "--num-workers", "1", "--jsonl-out",
+    ])
+    conv.main()
+
+    lines = output_file.read_text().splitlines()
+    assert [json.loads(line) for line in lines] == [
+        conv.convert_to_qwen_format(item)[0] for item in items
+    ]
+
+
+def test_main_failure_keeps_output_and_removes_temp_file(tmp_path, monkeypatch):
+    # A non-dict item makes conversion raise AttributeError mid-stream
+    input_file = tmp_path / "in.json"
+    input_file.write_text(json.dumps([_item("<ref>cat</ref>", "<point>[[1, 2]]</point>"), [1, 2]]))
+    output_file = tmp_path / "out.json"
+    output_file.write_text("previous")
+
+    monkeypatch.setattr(sys, "argv", [
+        "convert_pointing_to_qwen.py", str(input_file), str(output_file), "--num-workers", "1",
+    ])
+    with pytest.raises(AttributeError):
+        conv.main()
+
+    assert output_file.read_text() == "previous"
+    assert not (tmp_path / "out.json.tmp").exists()
@@ -12,30 +12,76 @@ Usage:
 """
 
 import json
+import os
+import contextlib
 import re
 import sys
+import signal
 import argparse
+import multiprocessing as mp
+from collections import Counter
+from functools import partial
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import Iterator, Dict, Any, Optional, Tuple
 
+import numpy as np
 
-def read_input_file(file_path: str) -> List[Dict[str, Any]]:
+# orjson is a much faster drop-in codec; fall back to stdlib json without it
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+_json_loads = orjson.loads if ORJSON_AVAILABLE else json.loads
+
+
+def _json_dumps(obj: Any, indent: bool = False) -> bytes:
+    """Serialize to UTF-8 JSON bytes, indented by 2 spaces if requested."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+    return json.dumps(obj, indent=2 if indent else None, ensure_ascii=False).encode('utf-8')
+
+# <ref>/<point> blocks, the [x, y] pairs inside a <point> block, and any
+# non-empty innermost [...] group (to count the entries that are not a pair)
+_REF_RE = re.compile(r'<ref>(.*?)</ref>')
+_POINT_RE = re.compile(r'<point>(.*?)</point>', re.DOTALL)
+_NUM = r'-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?'
+_PAIR_RE = re.compile(rf'\[\s*({_NUM})\s*,\s*({_NUM})\s*\]')
+_GROUP_RE = re.compile(r'\[\s*[^\s\[\]][^\[\]]*\]')
+# Anything that makes a number non-integer (decimal point or exponent)
+_NON_INT_RE = re.compile(r'[.eE]')
+# Whole-word "not" so e.g. "notable" or "annotation" don't count as absent
+_ABSENT_RE = re.compile(r'absent|\bnot\b', re.IGNORECASE)
+# Both tags in one pass; [^\n] keeps <ref> single-line like _REF_RE
+_REF_POINT_RE = re.compile(r'<ref>([^\n]*?)</ref>|<point>(.*?)</point>', re.DOTALL)
+
+# Reasons convert_to_qwen_format reports for skipped items
+SKIP_INCOMPLETE = "incomplete conversations"
+SKIP_ABSENT = "object absent"
+SKIP_NO_POINTS = "no points found"
+SKIP_BAD_POINTS = "invalid points"
+
+
+def read_input_file(file_path: str) -> Iterator[Dict[str, Any]]:
     """
     Read input file, handling both .json and .jsonl formats.
     
     Args:
         file_path: Path to input file
         
-    Returns:
-        List of data items
+    Yields:
+        Data items, one at a time (.jsonl is streamed line by line)
     """
-    with open(file_path, 'r', encoding='utf-8') as f:
+    with open(file_path, 'rb') as f:
         if file_path.endswith('.jsonl'):
-            # Read line by line for jsonl
-            return [json.loads(line.strip()) for line in f if line.strip()]
+            # Stream line by line for jsonl
+            for line in f:
+                if line.strip():
+                    yield _json_loads(line)
         else:
             # Read entire file for json
-            return json.load(f)
+            yield from _json_loads(f.read())
 
 
 def extract_label_from_ref(text: str) -> str:
@@ -48,13 +94,17 @@ def extract_label_from_ref(text: str) -> str:
     Returns:
         Extracted label or "object" if not found
     """
-    match = re.search(r'<ref>(.*?)</ref>', text)
+    match = _REF_RE.search(text)
     if match:
         return match.group(1).strip()
     return "object"
 
 
-def extract_points_from_response(text: str) -> List[List[int]]:
+def _no_points() -> np.ndarray:
+    return np.empty((0, 2), dtype=np.int32)
+
+
+def extract_points_from_response(text: str, verbose: bool = False) -> np.ndarray:
     """
     Extract points from <point>[[x1, y1], [x2, y2], ...]</point> tag.
     Converts all coordinates to integers (rounding floats if necessary).
@@ -63,100 +113,146 @@ def extract_points_from_response(text: str) -> List[List[int]]:
         text: Assistant response text
         
     Returns:
-        List of [x, y] coordinates as integers
+        Int32 array of shape (N, 2) with [x, y] rows (N = 0 if none found)
     """
     # Find <point>...</point> content
-    match = re.search(r'<point>(.*?)</point>', text, re.DOTALL)
+    match = _POINT_RE.search(text)
     if not match:
-        return []
+        return _no_points()
+    points = _parse_point_block(match.group(1), verbose)
+    return points if points is not None else _no_points()
+
+
+def _parse_point_block(block: str, verbose: bool = False) -> Optional[np.ndarray]:
+    """
+    Parse the inside of a <point> tag into an (N, 2) int32 array.
     
-    points_str = match.group(1).strip()
+    Returns None if the block has entries but none of them can be used
+    (malformed, or coordinates outside the int32 range).
+    """
+    # Only well-formed [x, y] entries are used; anything else (wrong arity,
+    # non-numeric values) is dropped rather than shifting later pairs
+    pairs = _PAIR_RE.findall(block)
+    invalid = len(_GROUP_RE.findall(block)) - len(pairs)
+    if invalid > 0:
+        print(f"Warning: Skipping {invalid} invalid point(s): {block[:200]}")
+        if not pairs:
+            return None
     
-    # Parse the list of lists
     try:
-        # Clean and parse
-        points_str = points_str.replace('\n', '').replace(' ', '')
-        points = json.loads(points_str)
-        
-        # Convert all coordinates to integers
-        int_points = []
-        for point in points:
-            if isinstance(point, list) and len(point) == 2:
-                # Convert each coordinate to int (round if float)
-                x = int(round(float(point[0]))) if isinstance(point[0], (int, float)) else int(point[0])
-                y = int(round(float(point[1]))) if isinstance(point[1], (int, float)) else int(point[1])
-                int_points.append([x, y])
-            else:
-                print(f"Warning: Skipping invalid point format: {point}")
+        # Convert all coordinates to integers (round if float); packed int32
+        # storage until the points are serialized
+        if not _NON_INT_RE.search(block):
+            # All-integer block (the common case): NumPy parses the strings
+            # directly, no float/round round-trip needed
+            return np.array(pairs, dtype=np.int32).reshape(-1, 2)
+        coords = [[int(round(float(x))), int(round(float(y)))] for x, y in pairs]
+        return np.array(coords, dtype=np.int32).reshape(-1, 2)
+    except (ValueError, OverflowError) as e:
+        if verbose:
+            print(f"\n{'='*60}")
+            print(f"ERROR: Point conversion failed")
+            print(f"Points: {pairs}")
+            print(f"Error: {e}")
+            print(f"{'='*60}\n")
+        return None
+
+
+def extract_ref_and_points(text: str, verbose: bool = False) -> Tuple[str, np.ndarray]:
+    """
+    Extract the <ref> label and <point> coordinates in a single scan.
+    
+    Matches extract_label_from_ref and extract_points_from_response on the
+    same text (the first tag of each kind wins), except that a tag nested
+    inside the other kind of tag is not seen.
+    
+    Args:
+        text: Assistant response text
         
-        return int_points
-    except json.JSONDecodeError as e:
-        print(f"\n{'='*60}")
-        print(f"ERROR: JSON parsing failed")
-        print(f"Points string: {points_str[:200]}...")
-        print(f"Error: {e}")
-        print(f"{'='*60}\n")
-        return []
-    except (ValueError, TypeError) as e:
-        print(f"\n{'='*60}")
-        print(f"ERROR: Point conversion failed")
-        print(f"Points: {points}")
-        print(f"Error: {e}")
-        print(f"{'='*60}\n")
-        return []
-
-
-def convert_to_qwen_format(item: Dict[str, Any]) -> Dict[str, Any]:
+    Returns:
+        (label, points) with label "object" and an empty (0, 2) array when missing
+    """
+    label, block = _find_ref_and_point_block(text)
+    points = _parse_point_block(block, verbose) if block is not None else None
+    return label, points if points is not None else _no_points()
+
+
+def _find_ref_and_point_block(text: str) -> Tuple[str, Optional[str]]:
+    """First <ref> label ("object" if missing) and raw <point> block (None if missing)."""
+    label = None
+    block = None
+    for match in _REF_POINT_RE.finditer(text):
+        if match.group(2) is not None:
+            if block is None:
+                block = match.group(2)
+        elif label is None:
+            label = match.group(1).strip()
+        if label is not None and block is not None:
+            break
+    
+    return label if label is not None else "object", block
+
+
+def convert_to_qwen_format(
+    item: Dict[str, Any],
+    verbose: bool = False
+) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
     """
     Convert a single item to Qwen format.
     
     Args:
         item: Original data item
+        verbose: Print why items are skipped (noisy when run in worker processes)
         
     Returns:
-        Qwen format item or None if conversion fails
+        (Qwen format item, None) on success, or (None, reason) with one of
+        the SKIP_* reasons if the item is skipped
     """
+    item_id = item.get('id', 'unknown')
+    
     if "conversations" not in item or len(item["conversations"]) < 2:
-        print(f"Warning: Skipping item {item.get('id', 'unknown')} - incomplete conversations")
-        return None
+        if verbose:
+            print(f"Warning: Skipping item {item_id} - incomplete conversations")
+        return None, SKIP_INCOMPLETE
     
     user_conv = item["conversations"][0]
     assistant_conv = item["conversations"][1]
     
-    # Extract label from user or assistant message
-    label = extract_label_from_ref(user_conv.get("value", ""))
-    if label == "object":
-        label = extract_label_from_ref(assistant_conv.get("value", ""))
-    
     # Check if assistant says object is absent
     assistant_value = assistant_conv.get("value", "")
-    if "absent" in assistant_value.lower() or "not" in assistant_value.lower():
+    if _ABSENT_RE.search(assistant_value):
         # Skip items where object is not present
-        print(f"Info: Skipping item {item.get('id', 'unknown')} - object absent")
-        return None
+        if verbose:
+            print(f"Info: Skipping item {item_id} - object absent")
+        return None, SKIP_ABSENT
     
-    # Extract points
-    points = extract_points_from_response(assistant_value)
+    # Extract label from user or assistant message, and points in the same pass
+    assistant_label, block = _find_ref_and_point_block(assistant_value)
+    label = extract_label_from_ref(user_conv.get("value", ""))
+    if label == "object":
+        label = assistant_label
     
-    if not points:
-        print(f"\n{'='*60}")
-        print(f"Warning: No points found in item {item.get('id', 'unknown')}")
-        print(f"Image: {item.get('image', 'N/A')}")
-        print(f"User message: {user_conv.get('value', 'N/A')[:100]}...")
-        print(f"Assistant message: {assistant_value[:200]}...")
-        print(f"{'='*60}\n")
-        return None
+    points = _parse_point_block(block, verbose) if block is not None else _no_points()
+    if points is None:
+        # A <point> block whose coordinates could not be used (malformed or
+        # out of int32 range), counted apart from items without points
+        if verbose:
+            print(f"Warning: Skipping item {item_id} - invalid points: {block[:200]}")
+        return None, SKIP_BAD_POINTS
+    
+    if len(points) == 0:
+        if verbose:
+            print(f"\n{'='*60}")
+            print(f"Warning: No points found in item {item_id}")
+            print(f"Image: {item.get('image', 'N/A')}")
+            print(f"User message: {user_conv.get('value', 'N/A')[:100]}...")
+            print(f"Assistant message: {assistant_value[:200]}...")
+            print(f"{'='*60}\n")
+        return None, SKIP_NO_POINTS
     
-    # Convert points to Qwen format
-    qwen_points = []
-    for point in points:
-        if len(point) != 2:
-            print(f"Warning: Invalid point format: {point}")
-            continue
-        qwen_points.append({
-            "point_2d": point,
-            "label": label
-        })
+    # Convert points to Qwen format (the extractor only yields [x, y] pairs),
+    # back to plain ints for JSON
+    qwen_points = [{"point_2d": point, "label": label} for point in points.tolist()]
     
     # Use standardized prompt template
     user_prompt = f"<image>\nLocate all {label} in this image and return points in JSON format."
@@ -176,7 +272,33 @@ def convert_to_qwen_format(item: Dict[str, Any]) -> Dict[str, Any]:
                 "value": qwen_response
             }
         ]
-    }
+    }, None
+
+
+def _convert_item(item: Dict[str, Any], verbose: bool = False):
+    """Pool worker: returns (converted, reason, item) with item only kept on failure."""
+    converted, reason = convert_to_qwen_format(item, verbose=verbose)
+    return converted, reason, (item if converted is None else None)
+
+
+def _init_worker() -> None:
+    """Leave Ctrl-C to the parent, which terminates the pool and cleans up."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _write_item(f, item: Dict[str, Any], index: int, jsonl: bool) -> None:
+    """
+    Append one converted item to an open output file.
+    
+    JSON-array output is laid out exactly like a 2-space indented dump of
+    the whole list, so the file does not depend on whether it was streamed.
+    """
+    if jsonl:
+        f.write(_json_dumps(item))
+        f.write(b"\n")
+        return
+    f.write(b"[\n  " if index == 0 else b",\n  ")
+    f.write(_json_dumps(item, indent=True).replace(b"\n", b"\n  "))
 
 
 def main():
@@ -202,67 +324,102 @@ Output format:
         """
     )
     parser.add_argument('input_file', help='Input file (.json or .jsonl)')
-    parser.add_argument('output_file', help='Output file (.json)')
+    parser.add_argument('output_file', help='Output file (.json, or .jsonl with --jsonl-out)')
     parser.add_argument('--skip-absent', action='store_true', 
                        help='Skip items where object is absent (default: True)', 
                        default=True)
     parser.add_argument('--save-malformed', type=str,
                        help='Save malformed samples to this file (optional)',
                        default=None)
+    parser.add_argument('--num-workers', type=int, default=os.cpu_count(),
+                       help='Worker processes for conversion (default: all CPUs, 1 disables)')
+    parser.add_argument('--verbose', action='store_true',
+                       help='Print the reason for every skipped item')
+    parser.add_argument('--jsonl-out', action='store_true',
+                       help='Write one item per line instead of a pretty-printed JSON array')
     
     args = parser.parse_args()
     
     print(f"Reading input from: {args.input_file}")
     
-    # Read input
-    try:
-        input_data = read_input_file(args.input_file)
-        print(f"Loaded {len(input_data)} items")
-    except Exception as e:
-        print(f"Error reading input file: {e}")
-        sys.exit(1)
-    
-    # Convert
-    output_data = []
+    # Read, convert and write, streaming items straight through so that
+    # converted items are never all held in memory
+    first_item = None
     malformed_data = []
-    skipped = 0
+    converted_count = 0
+    skip_reasons = Counter()
+    loaded = 0
     
-    for i, item in enumerate(input_data):
-        converted = convert_to_qwen_format(item)
-        if converted is not None:
-            output_data.append(converted)
-        else:
-            skipped += 1
-            if args.save_malformed:
-                malformed_data.append(item)
-    
-    print(f"\nConverted {len(output_data)} items successfully")
-    print(f"Skipped {skipped} items")
-    
-    # Write output
+    # Write through a large buffer into a temporary file that only replaces
+    # the output once complete, so a failed run never leaves a truncated file
+    tmp_output = args.output_file + '.tmp'
     try:
-        with open(args.output_file, 'w', encoding='utf-8') as f:
-            json.dump(output_data, f, indent=2, ensure_ascii=False)
-        print(f"\nOutput written to: {args.output_file}")
-    except Exception as e:
+        out_f = open(tmp_output, 'wb', buffering=1 << 20)
+    except OSError as e:
         print(f"Error writing output file: {e}")
         sys.exit(1)
     
+    # Items are independent, so conversion is spread over worker processes;
+    # imap keeps the output in input order
+    convert = partial(_convert_item, verbose=args.verbose)
+    pool = None
+    replaced = False
+    try:
+        if args.num_workers > 1:
+            pool = mp.Pool(args.num_workers, initializer=_init_worker)
+        items = read_input_file(args.input_file)
+        results = pool.imap(convert, items, chunksize=1024) if pool else map(convert, items)
+        for converted, reason, item in results:
+            loaded += 1
+            if converted is not None:
+                _write_item(out_f, converted, converted_count, args.jsonl_out)
+                if first_item is None:
+                    first_item = converted
+                converted_count += 1
+            else:
+                skip_reasons[reason] += 1
+                if args.save_malformed:
+                    malformed_data.append(item)
+        if not args.jsonl_out:
+            out_f.write(b"\n]" if converted_count else b"[]")
+        out_f.close()
+        os.replace(tmp_output, args.output_file)
+        replaced = True
+    except (OSError, ValueError) as e:
+        print(f"Error converting input file: {e}")
+        sys.exit(1)
+    finally:
+        out_f.close()
+        if pool is not None:
+            pool.terminate()
+        # Any failure (including unexpected errors and Ctrl-C) must not
+        # leave the partial temporary file behind
+        if not replaced:
+            with contextlib.suppress(OSError):
+                os.remove(tmp_output)
+    
+    print(f"Loaded {loaded} items")
+    print(f"\nConverted {converted_count} items successfully")
+    print(f"Skipped {sum(skip_reasons.values())} items")
+    for reason, count in skip_reasons.most_common():
+        print(f"  {reason}: {count}")
+    print(f"\nOutput written to: {args.output_file}")
+    
     # Save malformed samples if requested
     if args.save_malformed and malformed_data:
         try:
-            with open(args.save_malformed, 'w', encoding='utf-8') as f:
-                json.dump(malformed_data, f, indent=2, ensure_ascii=False)
+            with open(args.save_malformed, 'wb') as f:
+                f.write(_json_dumps(malformed_data, indent=True))
             print(f"\nMalformed samples saved to: {args.save_malformed}")
         except Exception as e:
             print(f"Warning: Could not save malformed samples: {e}")
     
     # Print sample
-    if output_data:
+    if first_item is not None:
         print("\n" + "="*60)
         print("Sample converted item:")
         print("="*60)
-        print(json.dumps(output_data[0], indent=2, ensure_ascii=False))
+        print(_json_dumps(first_item, indent=True).decode('utf-8'))
         print("="*60)
 
 